@@ -1,313 +1,396 @@
 import pandas as pd
+import numpy as np
 from datetime import datetime
 import calendar
 from ortools.sat.python import cp_model
 import sys
+import re
 import math
 from collections import defaultdict
+from functools import lru_cache
+from itertools import groupby
 import holidays
 
 # User-tweakable scale for decimal precision
 # scale = 1000 -> preserves up to 3 decimal places (e.g. 1.5 -> 1500)
 SCALE = 1000
 
-# Load data from template Excel: Name | On Leave/Course | Current Score
-excel_file = "Template.xlsx"
-sheet_name = 'Sheet1'
-required_columns = ["Name", "On Leave/Course", "Current Score"]
-
-try:
-    staff_df = pd.read_excel(excel_file, sheet_name=sheet_name)
-    # Check if required columns exist after loading
-    if not all(col in staff_df.columns for col in required_columns):
-        missing_cols = [col for col in required_columns if col not in staff_df.columns]
-        print(f"Error: Missing required columns in '{excel_file}' - '{sheet_name}': {missing_cols}", file=sys.stderr)
-        sys.exit(1) # Exit if required columns are missing
-except FileNotFoundError:
-    print(f"Error: The file '{excel_file}' was not found.", file=sys.stderr)
-    sys.exit(1) # Exit if file not found
-except Exception as e:
-    print(f"Error reading Excel file '{excel_file}' - '{sheet_name}': {e}", file=sys.stderr)
-    sys.exit(1) # Exit on other reading errors
-
-
-# Detect frozen names from "On Leave/Course" column
-frozen_names = set(
-    staff_df.loc[
-        staff_df["On Leave/Course"].astype(str).str.strip().str.lower() == "frozen",
-        "Name"
-    ].str.strip().str.lower()
-)
-
-# === USER INPUT FOR DUTY MONTH ===
-month_input = input("Enter duty month and year (MM-YYYY): ").strip()
-
-try:
-    duty_month, duty_year = map(int, month_input.split('-'))
-    start_date = datetime(duty_year, duty_month, 1)
-except Exception:
-    print("⚠️ Invalid format, using current month.")
-    now = datetime.now()
-    start_date = datetime(now.year, now.month, 1)
-    duty_month, duty_year = start_date.month, start_date.year
-
-last_day = calendar.monthrange(duty_year, duty_month)[1]
-end_date = datetime(duty_year, duty_month, last_day)
-
-# Get Singapore public holidays for the current year
-sg_holidays = holidays.Singapore(years=[duty_year, duty_year + 1])
-
-# Extract the day-of-month for holidays within this month
-public_holidays = {d.day for d in sg_holidays if d.year == duty_year and d.month == duty_month}
-
-print(f"Public Holidays in {duty_month:02d}-{duty_year}: {sorted(public_holidays)}")
-
-# Check if 1st of next month is a PH
-next_month = duty_month + 1 if duty_month < 12 else 1
-next_year = duty_year if duty_month < 12 else duty_year + 1
-first_next_month = datetime(next_year, next_month, 1)
-
-last_day_is_ph_eve = first_next_month in sg_holidays
-print(f"Last day ({last_day}) is PH Eve? {last_day_is_ph_eve}")
-
-# === ASSIGN POINTS TO DAYS ===
-# creates a list of format [Full Date/Time, Day (0 = Monday), Points (float before scaling)] -> duty_days
-# - Note weekdays Mon-Thu = 1 point, Fri = 1.5, weekends = 2 points
-days = pd.date_range(start=start_date, end= end_date)
-duty_days = []
-for d in days:
-    wd = d.weekday()  # Monday=0 ... Sunday=6
-    if wd >= 5:
-        point = 2.0
-    elif wd == 4:  # Friday
-        point = 1.5
-    else:
-        point = 1.0
+# Day-of-month tokens in the "On Leave/Course" column: a single day "5" or an inclusive range "1-5"
+DAY_TOKEN = re.compile(r"(\d+)(?:\s*[-–]\s*(\d+))?")
+# What may be left between the tokens: commas, semicolons and whitespace
+DAY_SEPARATORS = re.compile(r"[\s,;]*")
+
+
+def load_staff(excel_file, sheet_name, required_columns):
+    """Load the staff sheet (Name | On Leave/Course | Current Score), exiting with an error if it can't be used."""
+    try:
+        staff_df = pd.read_excel(excel_file, sheet_name=sheet_name, dtype={"On Leave/Course": str})
+        # Check if required columns exist after loading
+        if not all(col in staff_df.columns for col in required_columns):
+            missing_cols = [col for col in required_columns if col not in staff_df.columns]
+            print(f"Error: Missing required columns in '{excel_file}' - '{sheet_name}': {missing_cols}", file=sys.stderr)
+            sys.exit(1) # Exit if required columns are missing
+    except FileNotFoundError:
+        print(f"Error: The file '{excel_file}' was not found.", file=sys.stderr)
+        sys.exit(1) # Exit if file not found
+    except Exception as e:
+        print(f"Error reading Excel file '{excel_file}' - '{sheet_name}': {e}", file=sys.stderr)
+        sys.exit(1) # Exit on other reading errors
+    return staff_df
+
+
+@lru_cache(maxsize=None)
+def parse_hard_days(raw):
+    """Days of month in an "On Leave/Course" entry e.g. "1,5, 10-12" -> {1, 5, 10, 11, 12}, blank / "frozen" -> no days.
+
+    Returns (days, recognised). recognised is False if the entry contains anything other than days, day ranges and
+    separators (or a backwards range like "5-1"), in which case days only holds the parts that could be read.
+    """
+    if raw in ("", "frozen"):
+        return frozenset(), True
+
+    hard_days = set()
+    recognised = DAY_SEPARATORS.fullmatch(DAY_TOKEN.sub(" ", raw)) is not None
+    for first, last in DAY_TOKEN.findall(raw):
+        if not last:
+            hard_days.add(int(first))
+        elif int(first) <= int(last):
+            hard_days.update(range(int(first), int(last) + 1))
+        else:
+            recognised = False
+    return frozenset(hard_days), recognised
+
+
+def build_duty_days(start_date, end_date, public_holidays, last_day_is_ph_eve):
+    """Points for every day of the month, as parallel arrays indexed by day i.
+
+    Returns dates and points_scaled (the points as scaled integers).
+    Note weekdays Mon-Thu = 1 point, Fri = 1.5, weekends = 2 points, PH = 2 points, PH eve = 1.5 points.
+    """
+    days = pd.date_range(start=start_date, end= end_date)
+    wd = days.weekday.to_numpy()  # Monday=0 ... Sunday=6
+    points = np.where(wd >= 5, 2.0, np.where(wd == 4, 1.5, 1.0))  # weekend / Friday / Mon-Thu
 
     # Override for Public Holidays
-    if d.day in public_holidays:
-        point = 2.0  # PH itself
-    elif (d + pd.Timedelta(days=1)).day in public_holidays and point < 2.0: # overwrite if weekend is PH eve
-        point = 1.5  # PH eve
+    ph_list = list(public_holidays)
+    is_ph = np.isin(days.day.to_numpy(), ph_list)
+    is_ph_eve = np.isin((days + pd.Timedelta(days=1)).day.to_numpy(), ph_list)
+    points[is_ph] = 2.0  # PH itself
+    points[is_ph_eve & (points < 2.0)] = 1.5  # PH eve, don't overwrite if weekend (or PH) is PH eve
 
     # Special override for last day PH eve, only if not weekend
-    if d.day == last_day and last_day_is_ph_eve and point < 2.0:
-        point = 1.5
-
-    # store float point (will be converted to scaled integer later)
-    duty_days.append((d, wd, point))
-
-# Precompute scaled integer points for each day to keep CP-SAT integer-friendly i.e. scale up points to remain integer
-duty_days_scaled = []
-for (d, wd, p) in duty_days:
-    int_p = int(round(p * SCALE))
-    duty_days_scaled.append((d, wd, p, int_p))  # keep both float p and int_p for reference
-
-# initialise the OR-Tools model -> note that this is what runs the iterations
-model = cp_model.CpModel()
-assignments = {} # Note that this is a Boolean Variable e.g. day_1_staff_1
-day_names = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-
-# === GENERATE TRUTH TABLE ===
-# IMPORTANT NOTE INDEX I = DAYS INDEX J = STAFF
-# create a "truth table" considering constraints for every possible permutation, and store it into assignments
-for i, (day, weekday, point) in enumerate(duty_days):
-    for j, staff in staff_df.iterrows():
-
-        # Check if this person is frozen
-        if str(staff["Name"]).strip().lower() in frozen_names:
-            continue
-
-        hard_constraints = str(staff.get("On Leave/Course", "")).strip().lower()
-        hard_days = set()
-
-        allowed = True
-        preferred_days = []
-
-        if hard_constraints: # this deals with all the days a person is unable to do duty due to leave or on course
-            try:
-                tokens = [int(t.strip()) for t in hard_constraints.replace(',', ' ').split() if t.strip().isdigit()]
-                hard_days = set(tokens)
-            except Exception as e:
-                print(f"Error parsing hard constraints for {staff.get('Name')}: {e}", file=sys.stderr)
+    if last_day_is_ph_eve and points[-1] < 2.0:
+        points[-1] = 1.5
+
+    # Precompute scaled integer points for each day to keep CP-SAT integer-friendly i.e. scale up points to remain integer
+    int_points = np.rint(points * SCALE).astype(np.int64)
+
+    # one array per field (instead of a list of tuples) so consumers only touch the field they need
+    dates = days.to_numpy().astype("datetime64[D]")
+    points_scaled = int_points.astype(np.int32)
+    return dates, points_scaled
+
+
+def build_assignments(model, num_days, num_staff, active_staff_idx, hard_days_per_staff):
+    """Create the "truth table" of Boolean Variables, one per (day, staff) pair the staff is allowed to do.
+
+    Only active_staff_idx (the non-frozen staff) get variables, frozen staff have none on any day.
+
+    Returns the variables as adjacency lists assignments_by_day[i] = [(j, var), ...] and
+    assignments_by_staff[j] = [(i, var), ...].
+    """
+    assignments_by_day = [[] for _ in range(num_days)]
+    assignments_by_staff = [[] for _ in range(num_staff)]
+
+    # IMPORTANT NOTE INDEX I = DAYS INDEX J = STAFF
+    for i in range(num_days):
+        day_of_month = i + 1  # dates run consecutively from the 1st of the month
+        for j in active_staff_idx:
 
             # If current day-of-month is in hard constraint days, block it
-            if day.day in hard_days:
-                allowed = False
+            if day_of_month in hard_days_per_staff[j]:
+                continue
 
-        if allowed:
             var = model.NewBoolVar(f"day_{i}_staff_{j}")
-            assignments[(i, j)] = var
-
-# === ASSIGN CONSTRAINTS ===
-# Iterate through every day and add a new constraint to the model "AddExactlyOne"
-for i in range(len(duty_days)):
-    # ensure we only add the constraint if at least one staff is allowed that day
-    allowed_vars = [assignments[(i, j)] for j in range(len(staff_df)) if (i, j) in assignments]
-    if allowed_vars:
-        model.AddExactlyOne(allowed_vars)
-    else:
-        # No one is available that day (all blocked by hard constraints)
-        print(f"Warning: No available staff for date {duty_days[i][0].strftime('%Y-%m-%d')}", file=sys.stderr)
-
-# Constraint #1: No more than one duty per week per person
-for j in range(len(staff_df)):
-    week_groups = {}
-    for i, (day, _, _) in enumerate(duty_days):
-        week_num = day.isocalendar()[1]  # ISO week number
-        week_groups.setdefault(week_num, []).append(i)
-
-    for week_num, days_in_week in week_groups.items():
-        vars_in_week = [assignments[(i, j)] for i in days_in_week if (i, j) in assignments] # e.g. week 34, when can Keith do duty?
-        if vars_in_week:  # Only add if staff is eligible for that week
-            model.Add(sum(vars_in_week) <= 1)
-
-# Constraint #2: 4 day gap for the same person
-for j in range(len(staff_df)):  # Loop over staff
-    if staff_df.loc[j, "Name"].strip().lower() in [n.lower() for n in frozen_names]: # don't have to deal with frozen names
-      continue
-    for i, (date_i, _, _) in enumerate(duty_days):
-        for k, (date_k, _, _) in enumerate(duty_days):
-            if abs((date_k - date_i).days) < 4 and i != k:
-                if (i, j) in assignments and (k, j) in assignments:
-                    model.Add(assignments[(i, j)] + assignments[(k, j)] <= 1)
-
-
-# Calculate and balance scores
-# Read current scores and scale them ("supports floats" after scaling)
-current_scores_scaled = []
-for j in range(len(staff_df)):
-    raw = staff_df.loc[j, "Current Score"]
+            assignments_by_day[i].append((j, var))
+            assignments_by_staff[j].append((i, var))
+
+    return assignments_by_day, assignments_by_staff
+
+
+def add_constraints(model, week_of_day, date_labels, assignments_by_day):
+    """Add the duty rules to the model."""
+    num_days = len(week_of_day)
+
+    # Iterate through every day and add a new constraint to the model "AddExactlyOne"
+    for i, day_pairs in enumerate(assignments_by_day):
+        # ensure we only add the constraint if at least one staff is allowed that day
+        if day_pairs:
+            model.AddExactlyOne([var for _, var in day_pairs])
+        else:
+            # No one is available that day (all blocked by hard constraints)
+            print(f"Warning: No available staff for date {date_labels[i]}", file=sys.stderr)
+
+    # Integer view of the same schedule: day_assign[i] = index of the staff doing duty on day i (None if nobody can)
+    # channelled to the booleans, so the "same person" constraints below can be stated once per group of days
+    # with AddAllDifferent instead of once per staff per pair of days
+    day_assign = [None] * num_days
+    for i, day_pairs in enumerate(assignments_by_day):
+        if day_pairs:
+            day_assign[i] = model.NewIntVarFromDomain(cp_model.Domain.FromValues([j for j, _ in day_pairs]), f"duty_{i}")
+            model.Add(day_assign[i] == sum(j * var for j, var in day_pairs))
+
+    # Constraint #1: No more than one duty per week per person
+    for _, days_in_week in groupby(range(num_days), key=lambda i: week_of_day[i]):
+        vars_in_week = [day_assign[i] for i in days_in_week if day_assign[i] is not None]
+        if len(vars_in_week) > 1:
+            model.AddAllDifferent(vars_in_week)  # a different person every day of the week
+
+    # Constraint #2: 4 day gap for the same person
+    # dates are consecutive calendar days, so any two days less than 4 days apart lie in a window of 4 consecutive days
+    # -> a different person on every day of each sliding 4-day window (frozen staff are never in a domain)
+    for i in range(num_days - 3):  # windows starting in the last 3 days are covered by the window ending on the last day
+        vars_in_window = [day_assign[k] for k in range(i, i + 4) if day_assign[k] is not None]
+        if len(vars_in_window) > 1:
+            model.AddAllDifferent(vars_in_window)
+
+
+def add_objective(model, points_scaled, week_of_day, assignments_by_staff, current_scores_scaled, target_score_scaled):
+    """Minimise the total deviation of every staff's score after planning from the target score."""
+    # Create deviation variables
+    deviations = []
+    for j, staff_pairs in enumerate(assignments_by_staff):
+        # Sum of all scaled points assigned this month for staff j
+        # kept as a linear expression (no score IntVar) so presolve folds it straight into the deviation constraint
+        staff_vars = [var for _, var in staff_pairs]
+        staff_points = points_scaled[[i for i, _ in staff_pairs]].tolist()
+        assigned_points_expr = cp_model.LinearExpr.WeightedSum(staff_vars, staff_points)
+
+        # Tightest upper bound on the points staff j can collect this month:
+        # at most one duty per week (Constraint #1) -> the best day staff j is eligible for in each week
+        # staff_pairs is in day order and the days of a week are consecutive, so a single groupby pass buckets them
+        assigned_upper = sum(int(max(points_scaled[i] for i, _ in pairs_in_week))
+                             for _, pairs_in_week in groupby(staff_pairs, key=lambda pair: week_of_day[pair[0]]))
+
+        # the deviation can be at most the distance from the target to either end of the possible scores
+        max_dev = max(target_score_scaled - current_scores_scaled[j],
+                      current_scores_scaled[j] + assigned_upper - target_score_scaled, 0)
+        dev = model.NewIntVar(0, max_dev, f"dev_{j}")
+        # score = assigned points + current score (constant, scaled)
+        model.AddAbsEquality(dev, assigned_points_expr + (current_scores_scaled[j] - target_score_scaled))
+        deviations.append(dev)
+
+    # Objective: minimize total deviation
+    model.Minimize(sum(deviations))
+
+
+def add_symmetry_breaking(model, assignments_by_staff, frozen_mask, hard_days_per_staff, current_scores_scaled):
+    """Order the duty counts of interchangeable staff so the solver doesn't explore every permutation of them.
+
+    Staff with the same hard constraint days and the same current score are interchangeable (swapping their duties
+    gives the same objective). Within each group, duty counts are required to be non-increasing in staff order.
+    """
+    interchangeable = defaultdict(list)
+    for j in range(len(frozen_mask)):
+        if not frozen_mask[j]:
+            interchangeable[(hard_days_per_staff[j], current_scores_scaled[j])].append(j)
+
+    for group in interchangeable.values():
+        for ja, jb in zip(group, group[1:]):  # consecutive pairs are enough, the ordering is transitive
+            model.Add(sum(var for _, var in assignments_by_staff[ja]) >= sum(var for _, var in assignments_by_staff[jb]))
+
+
+def assign_standby(staff_of_day, candidates):
+    """Pick a standby for every day, spreading standbys evenly over candidates (staff indices).
+
+    Each day goes to the candidate with the fewest standbys so far (ties -> earlier in candidates)
+    who has no actual duty within 4 days of it. Returns the standby staff index per day, -1 if nobody is eligible.
+    """
+    num_days = staff_of_day.shape[0]
+    standby_counts = np.zeros(candidates.shape[0], dtype=np.int32)  # Track how many standbys each person has
+    standby_of_day = np.full(num_days, -1, dtype=np.int32)
+
+    for i in range(num_days):
+        best = -1
+        for c in range(candidates.shape[0]):
+            if best != -1 and standby_counts[c] >= standby_counts[best]:
+                continue
+
+            # Check the 4-day gap from actual duties (days are consecutive -> only days i-3 .. i+3 can clash)
+            too_close = False
+            for k in range(max(0, i - 3), min(num_days, i + 4)):
+                if staff_of_day[k] == candidates[c]:
+                    too_close = True
+                    break
+            if too_close:
+                continue
+
+            # Check the 4-day gap from previous standby duties
+            # For now, this check is omitted to simplify, but could be added if needed
+            best = c
+
+        if best != -1:
+            standby_of_day[i] = candidates[best]
+            standby_counts[best] += 1
+
+    return standby_of_day
+
+
+def write_output(schedule_df, score_df, output_file):
+    """Export the duty schedule and the updated scores to one workbook."""
+    # xlsxwriter only writes (no workbook object tree like openpyxl) -> faster export
+    # note: its constant_memory mode can't be used here, pandas writes cells column by column and that mode would drop them
+    with pd.ExcelWriter(output_file, engine='xlsxwriter') as writer:
+      schedule_df.to_excel(writer, sheet_name="Duty Schedule", index=False)
+      score_df.to_excel(writer, sheet_name="Updated Scores", index=False)
+
+    print(f"Exported: {output_file}")
+
+
+def main():
+    # Load data from template Excel: Name | On Leave/Course | Current Score
+    excel_file = "Template.xlsx"
+    sheet_name = 'Sheet1'
+    required_columns = ["Name", "On Leave/Course", "Current Score"]
+    staff_df = load_staff(excel_file, sheet_name, required_columns)
+
+    # Detect frozen names from "On Leave/Course" column
+    frozen_names = set(
+        staff_df.loc[
+            staff_df["On Leave/Course"].astype(str).str.strip().str.lower() == "frozen",
+            "Name"
+        ].str.strip().str.lower()
+    )
+
+    # === USER INPUT FOR DUTY MONTH ===
+    month_input = input("Enter duty month and year (MM-YYYY): ").strip()
+
     try:
-        val = float(raw)
+        duty_month, duty_year = map(int, month_input.split('-'))
+        start_date = datetime(duty_year, duty_month, 1)
     except Exception:
-        val = 0.0
-    current_scores_scaled.append(int(round(val * SCALE)))
-
-# Precompute maximum possible month points (scaled)
-max_month_points = sum(int_p for (_, _, _, int_p) in duty_days_scaled)
-
-staff_scores = []
-
-# === SOLVE OPTIMAL SOLUTION WITH OBJECTIVE FUNCTION ===
-for j in range(len(staff_df)):
-    # Sum of all scaled points assigned this month for staff j
-    assigned_points_expr = sum(assignments[(i, j)] * duty_days_scaled[i][3]
-                               for i in range(len(duty_days_scaled)) if (i, j) in assignments)
-
-    # Add the current score (constant, scaled)
-    # compute reasonable bounds for the total_score variable
-    lower_bound = min(current_scores_scaled)  # at least the minimum current score
-    upper_bound = max(current_scores_scaled) + max_month_points
-
-    total_score = model.NewIntVar(lower_bound - max_month_points, upper_bound + max_month_points, f"score_{j}")
-    model.Add(total_score == assigned_points_expr + current_scores_scaled[j])
-
-    staff_scores.append(total_score)
-
-# max and min score across staff (scaled)
-# set bounds reasonably
-global_min_bound = min(current_scores_scaled) - max_month_points
-global_max_bound = max(current_scores_scaled) + max_month_points
-
-# Compute a fixed target score (scaled)
-# Average current score
-avg_current_score = sum(current_scores_scaled) / len(current_scores_scaled)
-# Average monthly points per person
-avg_month_points = int(sum(int_p for (_, _, _, int_p) in duty_days_scaled) / (len(staff_df) - len(frozen_names)))
-target_score_scaled = int(round(avg_current_score + avg_month_points))
-
-# Create deviation variables
-deviations = []
-for j, score_var in enumerate(staff_scores):
-    dev = model.NewIntVar(0, max_month_points, f"dev_{j}")
-    model.Add(dev >= score_var - target_score_scaled)
-    model.Add(dev >= target_score_scaled - score_var)
-    deviations.append(dev)
-
-# Objective: minimize total deviation
-model.Minimize(sum(deviations))
-
-# Solve the model
-solver = cp_model.CpSolver()
-solver.parameters.max_time_in_seconds = 10.0  # limit to 15 seconds (otherwise it will take about 1-4 mins to solve with no improved performance or may loop infinitely)
-status = solver.Solve(model)
-
-# Output results
-if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
-    schedule = []
-    final_scores_scaled = [current_scores_scaled[j] for j in range(len(staff_df))]
+        print("⚠️ Invalid format, using current month.")
+        now = datetime.now()
+        start_date = datetime(now.year, now.month, 1)
+        duty_month, duty_year = start_date.month, start_date.year
+
+    last_day = calendar.monthrange(duty_year, duty_month)[1]
+    end_date = datetime(duty_year, duty_month, last_day)
+
+    # Get Singapore public holidays for the current year
+    sg_holidays = holidays.Singapore(years=[duty_year, duty_year + 1])
+
+    # Extract the day-of-month for holidays within this month
+    public_holidays = {d.day for d in sg_holidays if d.year == duty_year and d.month == duty_month}
+
+    print(f"Public Holidays in {duty_month:02d}-{duty_year}: {sorted(public_holidays)}")
+
+    # Check if 1st of next month is a PH
+    next_month = duty_month + 1 if duty_month < 12 else 1
+    next_year = duty_year if duty_month < 12 else duty_year + 1
+    first_next_month = datetime(next_year, next_month, 1)
+
+    last_day_is_ph_eve = first_next_month in sg_holidays
+    print(f"Last day ({last_day}) is PH Eve? {last_day_is_ph_eve}")
+
+    # === ASSIGN POINTS TO DAYS ===
+    dates, points_scaled = build_duty_days(start_date, end_date, public_holidays, last_day_is_ph_eve)
+    date_labels = np.datetime_as_string(dates).tolist()  # 'YYYY-MM-DD' for output
+    num_days = len(dates)
+    week_of_day = pd.DatetimeIndex(dates).isocalendar().week.to_numpy(dtype=np.int16)  # ISO week number of every day
+
+    # === EXTRACT STAFF COLUMNS ===
+    # pull the columns out of the DataFrame once so the hot loops below index plain lists instead of going through pandas
+    names = staff_df["Name"].astype(str).str.strip().tolist()
+    names_lower = [n.lower() for n in names]
+    hard_raw = staff_df["On Leave/Course"].fillna("").astype(str).str.strip().str.lower().tolist()
+    scores_raw = pd.to_numeric(staff_df["Current Score"], errors="coerce").to_numpy() # non-numeric scores become NaN -> 0
+    frozen_mask = [n in frozen_names for n in names_lower]
+    active_staff_idx = [j for j in range(len(staff_df)) if not frozen_mask[j]]  # frozen staff are skipped everywhere
+
+    # parse the days a person is unable to do duty due to leave or on course (once per staff, not once per day)
+    hard_days_per_staff = []
+    for j, raw in enumerate(hard_raw):
+        hard_days, recognised = parse_hard_days(raw)
+        if not recognised:
+            print(f"Warning: Could not fully read On Leave/Course for {names[j]} ('{raw}'), "
+                  f"only blocking days {sorted(hard_days)}", file=sys.stderr)
+        hard_days_per_staff.append(hard_days)
+
+    # Calculate and balance scores
+    # Read current scores and scale them ("supports floats" after scaling)
+    current_scores_scaled = np.round(np.nan_to_num(scores_raw.astype(float)) * SCALE).astype(int).tolist()
+
+    # Precompute maximum possible month points (scaled) -> single reduction, reused below
+    max_month_points = int(points_scaled.sum())
+
+    # Compute a fixed target score (scaled)
+    # Average monthly points per person, only active (non-frozen) staff share this month's duties
+    active_staff = len(active_staff_idx)
+    if active_staff == 0:
+        print("Error: All staff are frozen, nobody is available for duty this month.", file=sys.stderr)
+        sys.exit(1)
+    avg_month_points = max_month_points // active_staff
+    # Average current score
+    avg_current_score = sum(current_scores_scaled) / len(current_scores_scaled)
+    target_score_scaled = int(round(avg_current_score + avg_month_points))
+
+    # initialise the OR-Tools model -> note that this is what runs the iterations
+    model = cp_model.CpModel()
+
+    # === GENERATE TRUTH TABLE ===
+    assignments_by_day, assignments_by_staff = build_assignments(
+        model, num_days, len(staff_df), active_staff_idx, hard_days_per_staff)
+
+    # === ASSIGN CONSTRAINTS ===
+    add_constraints(model, week_of_day, date_labels, assignments_by_day)
+
+    # === SOLVE OPTIMAL SOLUTION WITH OBJECTIVE FUNCTION ===
+    add_objective(model, points_scaled, week_of_day, assignments_by_staff, current_scores_scaled, target_score_scaled)
+    add_symmetry_breaking(model, assignments_by_staff, frozen_mask, hard_days_per_staff, current_scores_scaled)
+
+    # Solve the model
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = 10.0  # limit to 15 seconds (otherwise it will take about 1-4 mins to solve with no improved performance or may loop infinitely)
+    # num_workers is left at CP-SAT's default (0 = one worker per available core), a fixed count oversubscribes small machines
+    solver.parameters.linearization_level = 2  # stronger LP relaxation, helps with the linear deviation objective
+    # solver.parameters.log_search_progress = True  # uncomment to see the solver log when tuning
+    status = solver.Solve(model)
+
+    # Output results
+    if status not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+        print("No feasible solution found.")
+        return
 
-    for i, (date, _, _, point_scaled) in enumerate(duty_days_scaled):
-        for j in range(len(staff_df)):
-            if (i, j) in assignments and solver.Value(assignments[(i, j)]):
-                name = staff_df.loc[j, "Name"]
+    schedule = []
+    final_scores_scaled = list(current_scores_scaled)
+    staff_of_day = np.full(num_days, -1, dtype=np.int32)  # staff index doing duty on day i (-1 = nobody)
+
+    # only the staff eligible on day i can be assigned, and exactly one of them is -> stop at the first true variable
+    for i, day_pairs in enumerate(assignments_by_day):
+        point_scaled = int(points_scaled[i])
+        for j, var in day_pairs:
+            if solver.BooleanValue(var):
+                name = names[j]
                 # convert scaled points back to float for output convenience
                 pts_float = point_scaled / SCALE
-                schedule.append({"Date": date.strftime('%Y-%m-%d'), "Assigned To": name, "Points": pts_float})
+                schedule.append({"Date": date_labels[i], "Assigned To": name, "Points": pts_float})
                 final_scores_scaled[j] += point_scaled
+                staff_of_day[i] = j
+                break
 
     schedule_df = pd.DataFrame(schedule)
 
-    # Build mapping of actual duty days per person
-    actual_duties = defaultdict(list)
-    for _, row in schedule_df.iterrows():
-        actual_duties[row["Assigned To"].strip().lower()].append(
-            datetime.strptime(row["Date"], "%Y-%m-%d")
-        )
-
     # Prepare for standby assignment
-    staff_list = list(staff_df["Name"].str.strip())
     # Exclude frozen staff from standby eligibility
-    staff_list = [
-        name.strip()
-        for name in staff_df["Name"]
-        if name.strip().lower() not in frozen_names
-    ]
-    standby_schedule = []
-    standby_counts = {name: 0 for name in staff_list}  # Track how many standbys each person has
+    standby_candidates = np.array(active_staff_idx, dtype=np.int32)
 
     # Assign standby evenly with ≥4-day gap rule
-    for i, (duty_date, _, _, _) in enumerate(duty_days_scaled):
-        # Sort staff by current standby count (lowest first) for balancing
-        sorted_candidates = sorted(staff_list, key=lambda n: standby_counts[n])
-
-        assigned = False
-        for candidate in sorted_candidates:
-            cand_lower = candidate.lower()
-
-            # Check the 4-day gap from actual duties
-            too_close = any(abs((duty_date - ad).days) < 4 for ad in actual_duties[cand_lower])
-            if too_close:
-                continue
-
-            # Check the 4-day gap from previous standby duties
-            # This requires tracking standby duties for each person, similar to actual_duties
-            # For now, this check is omitted to simplify, but could be added if needed
-            # standby_too_close = any(abs((duty_date - sd).days) < 4 for sd in standby_duties[cand_lower])
-            # if standby_too_close:
-            #     continue
-
-            # Assign standby
-            standby_schedule.append({
-                "Date": duty_date.strftime("%Y-%m-%d"),
-                "Standby": candidate
-            })
-            standby_counts[candidate] += 1
-            # If assigned, add to standby_duties for future 4-day gap checks (if implemented)
-            # standby_duties[cand_lower].append(duty_date)
-            assigned = True
-            break
-
-
-        if not assigned:
-            standby_schedule.append({
-                "Date": duty_date.strftime("%Y-%m-%d"),
-                "Standby": "No eligible staff"
-            })
-
-    # Create standby DataFrame
-    standby_df = pd.DataFrame(standby_schedule)
+    standby_of_day = assign_standby(staff_of_day, standby_candidates)
+    standby_schedule = [
+        {"Date": date_labels[i], "Standby": names[j] if j >= 0 else "No eligible staff"}
+        for i, j in enumerate(standby_of_day.tolist())
+    ]
 
     # convert final scaled scores back to floats with up to 3 decimal places
     final_scores = [round(s / SCALE, 3) for s in final_scores_scaled]
@@ -320,16 +403,12 @@ if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
     score_df["Next Score to Use"] = score_df["Score After Planning"] - (avg_month_points / 1000)
 
     # If frozen person exists,  overwrite the above and keep their Next Score same as their current score
-    for frozen_name in frozen_names:
-
-      score_df.loc[score_df["Name"].str.lower() == frozen_name,
-                  "Next Score to Use"] = staff_df.loc[
-                      staff_df["Name"].str.lower() == frozen_name,
-                      "Current Score"
-                  ].values
+    # (frozen_mask was built once from the already lowercased names, no need to re-lower the Name column per frozen name)
+    if any(frozen_mask):
+      score_df.loc[frozen_mask, "Next Score to Use"] = staff_df.loc[frozen_mask, "Current Score"].values
 
       # Add (Frozen) next to names that were frozen for this month
-      score_df.loc[score_df["Name"].str.lower() == frozen_name, "Name"] = str(frozen_name).upper() + " (Frozen)"
+      score_df.loc[frozen_mask, "Name"] = [names[j].upper() + " (Frozen)" for j in range(len(staff_df)) if frozen_mask[j]]
 
 
     # Update scaled down average month points
@@ -339,11 +418,8 @@ if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
     # Merge standby names into schedule_df
     schedule_df["Standby"] = [entry["Standby"] for entry in standby_schedule]
 
-    with pd.ExcelWriter("Duty_Planner_Combined.xlsx", engine='openpyxl') as writer:
-      schedule_df.to_excel(writer, sheet_name="Duty Schedule", index=False)
-      score_df.to_excel(writer, sheet_name="Updated Scores", index=False)
+    write_output(schedule_df, score_df, "Duty_Planner_Combined.xlsx")
 
-    print("Exported: Duty_Planner_Combined.xlsx")
 
-else:
-    print("No feasible solution found.")
+if __name__ == "__main__":
+    main()